@@ -4,14 +4,305 @@ It handles fetching ads data based on specified parameters.
 """
 # AdDownloader/adlib_api.py
 
-import requests
-import pandas as pd
+# pandas and requests are imported where they are used, so importing the package (e.g. for `--help`) stays fast
 import time
 import os
 import datetime
+import json
+import csv
+import gzip
+import hashlib
+import threading
+from abc import ABC, abstractmethod
+import functools
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlencode, quote
 from rich import print as rprint # For rich console output
 # from rich.progress import track # Optional for later
 # Removed: from .helpers import load_config (as it's not needed here)
+try:
+    import orjson
+except ImportError: # orjson is optional, the stdlib json module is used instead
+    orjson = None
+try:
+    import xlsxwriter
+except ImportError: # xlsxwriter is optional, xlsx output falls back to pandas/openpyxl
+    xlsxwriter = None
+
+
+# --- JSON helpers: orjson when installed, the stdlib json module otherwise. Both work on UTF-8 bytes. ---
+def _json_loads(content):
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+def _json_dumps(obj, indent: bool = False, newline: bool = False) -> bytes:
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_APPEND_NEWLINE if newline else 0)
+        return orjson.dumps(obj, option=option)
+    text = json.dumps(obj, ensure_ascii=False, indent=2 if indent else None, separators=None if indent else (',', ':'))
+    return (text + '\n' if newline else text).encode('utf-8')
+
+
+class _RateLimiter:
+    """
+    A small thread-safe token bucket used to pace requests to the Meta API.
+
+    Up to `burst` requests can be issued back to back; after that, requests
+    are spaced so that on average no more than `rate` requests per second are made.
+    The time spent waiting on the network counts towards the spacing, unlike a fixed sleep.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(burst))
+        self._tokens = float(self.capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            wait_time = (1 - self._tokens) / self.rate
+            # sleep while holding the lock so concurrent callers queue up in order
+            time.sleep(wait_time)
+            self._tokens = 0.0
+            self._last = time.monotonic()
+
+
+def _to_cell(value):
+    """Convert a raw API value to the string written in tabular outputs (lists/dicts keep their Python repr, as pandas did)."""
+    if value is None or isinstance(value, str):
+        return value
+    return str(value)
+
+
+class _AdsWriter(ABC):
+    """
+    Base class for writers that stream ad records to the final output file page by page,
+    so that the whole download never has to be held in memory at once.
+    """
+    extension = 'csv'
+
+    def __init__(self, file_basename: str, columns: list):
+        self.path = f"{file_basename}.{self.extension}"
+        self.columns = columns
+        self.rows_written = 0
+
+    @abstractmethod
+    def write_page(self, records: list):
+        """Append one page of ad records (dicts from the API) to the output file."""
+
+    def close(self):
+        pass
+
+
+class _CsvAdsWriter(_AdsWriter):
+    """The API already returns plain dicts, so they are written with csv.DictWriter without going through a DataFrame."""
+    extension = 'csv'
+
+    def __init__(self, file_basename: str, columns: list):
+        super().__init__(file_basename, columns)
+        self._file = open(self.path, 'w', encoding='utf-8-sig', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction='ignore', quoting=csv.QUOTE_MINIMAL)
+        self._writer.writeheader()
+
+    def write_page(self, records: list):
+        self._writer.writerows({col: _to_cell(value) for col, value in record.items()} for record in records)
+        self.rows_written += len(records)
+
+    def close(self):
+        self._file.close()
+
+
+class _JsonAdsWriter(_AdsWriter):
+    """Records are serialized one by one (with orjson when available) into a single JSON array."""
+    extension = 'json'
+
+    def __init__(self, file_basename: str, columns: list):
+        super().__init__(file_basename, columns)
+        self._file = open(self.path, 'wb')
+        self._file.write(b'[')
+
+    def write_page(self, records: list):
+        for record in records:
+            self._file.write(b',\n' if self.rows_written else b'\n')
+            self._file.write(_json_dumps({col: record.get(col) for col in self.columns}, indent=True))
+            self.rows_written += 1
+
+    def close(self):
+        self._file.write(b'\n]' if self.rows_written else b']')
+        self._file.close()
+
+
+class _XlsxAdsWriter(_AdsWriter):
+    """
+    Rows are streamed to the sheet with xlsxwriter in constant_memory mode (each row is flushed to disk
+    once written). Without xlsxwriter, rows are buffered and written with pandas/openpyxl on close.
+    xlsxwriter does not raise on Excel's limits, so they are enforced here: strings longer than a cell
+    can hold are truncated (and reported), rows past the last sheet row continue in a CSV overflow file.
+    """
+    extension = 'xlsx'
+    MAX_ROWS = 1048576 # rows per Excel sheet, header included
+    MAX_CELL_CHARS = 32767 # characters per Excel cell
+
+    def __init__(self, file_basename: str, columns: list):
+        super().__init__(file_basename, columns)
+        self._file_basename = file_basename
+        self._records = None
+        self._overflow = None # _CsvAdsWriter for the rows that do not fit on the sheet
+        self.truncated_cells = 0
+        if xlsxwriter is not None:
+            # plain strings only: no automatic URL/formula conversion of ad texts and snapshot URLs
+            self._workbook = xlsxwriter.Workbook(self.path, {'constant_memory': True, 'strings_to_urls': False, 'strings_to_formulas': False})
+            self._worksheet = self._workbook.add_worksheet()
+            self._worksheet.write_row(0, 0, columns)
+        else:
+            self._records = []
+
+    def _to_excel_value(self, value):
+        # Excel cells cannot hold lists/dicts, keep their Python repr as the openpyxl export did
+        if isinstance(value, (list, dict)):
+            value = str(value)
+        if isinstance(value, str) and len(value) > self.MAX_CELL_CHARS:
+            # truncated here rather than by xlsxwriter, whose write_row stops at the first truncated cell of a row
+            self.truncated_cells += 1
+            value = value[:self.MAX_CELL_CHARS]
+        return value
+
+    @property
+    def overflow_path(self):
+        return self._overflow.path if self._overflow is not None else None
+
+    def write_page(self, records: list):
+        if self._records is None:
+            for i, record in enumerate(records):
+                if self.rows_written + 1 >= self.MAX_ROWS: # the sheet is full: the rest of the download goes to CSV
+                    if self._overflow is None:
+                        self._overflow = _CsvAdsWriter(f"{self._file_basename}_overflow", self.columns)
+                        rprint(f"[orange3]Warning: Excel's limit of {self.MAX_ROWS} rows per sheet was reached, further ads are saved to {self._overflow.path}.[orange3]")
+                    self._overflow.write_page(records[i:])
+                    self.rows_written += len(records) - i
+                    return
+                error = self._worksheet.write_row(self.rows_written + 1, 0, [self._to_excel_value(record.get(col)) for col in self.columns])
+                if error == -1:
+                    raise ValueError(f"row {self.rows_written + 1} is outside the Excel sheet limits")
+                self.rows_written += 1
+        else:
+            self._records.extend({col: self._to_excel_value(value) for col, value in record.items()} for record in records)
+            self.rows_written += len(records)
+
+    @property
+    def is_buffered(self) -> bool:
+        return self._records is not None
+
+    def to_dataframe(self):
+        import pandas as pd
+        df = pd.DataFrame(self._records, columns=self.columns)
+        try:
+            # Arrow-backed columns take a fraction of the memory of NumPy object columns for this string-heavy data
+            return df.convert_dtypes(dtype_backend='pyarrow')
+        except (TypeError, ImportError): # pandas < 2.0 or pyarrow not installed
+            return df
+
+    def close(self):
+        try:
+            if self._records is None:
+                self._workbook.close()
+            else:
+                self.to_dataframe().to_excel(self.path, index=False, engine='openpyxl')
+        finally:
+            if self._overflow is not None:
+                self._overflow.close()
+            if self.truncated_cells:
+                rprint(f"[orange3]Warning: {self.truncated_cells} cells were longer than Excel's {self.MAX_CELL_CHARS} characters and were truncated in {self.path}.[orange3]")
+
+
+_ADS_WRITERS = {'csv': _CsvAdsWriter, 'json': _JsonAdsWriter, 'xlsx': _XlsxAdsWriter}
+
+
+class _DownloadSink:
+    """
+    Destination shared by all the queries of one download: the raw NDJSON.gz dump and the output writer.
+    Queries may run in parallel threads, so output writes go through a lock; raw dumps go through a
+    background I/O thread.
+    """
+    def __init__(self, writer_cls, file_basename: str, columns: list, raw_json_file=None):
+        self.writer_cls = writer_cls
+        self.file_basename = file_basename
+        self.columns = columns
+        self.raw_json_file = raw_json_file
+        self.writer = None # opened on the first page with data, so no empty file is left behind
+        self.total_ads = 0
+        self.data_fetched = False
+        self.write_failed = False
+        self.cancelled = False # set on Ctrl+C: running queries stop after their current page
+        self._lock = threading.Lock()
+        # A single worker keeps the lines of the shared gzip file in order without extra locking
+        self._io_pool = ThreadPoolExecutor(max_workers=1)
+
+    def save_raw(self, data: dict, where: str):
+        """Queue a raw response for the background writer, so the next request does not wait on the disk."""
+        if self.raw_json_file is not None:
+            self._io_pool.submit(self._write_raw, data, where)
+
+    def run_in_background(self, fn, *args):
+        """Run other disk work of the download (e.g. response cache files) on the same background I/O thread."""
+        self._io_pool.submit(fn, *args)
+
+    def _write_raw(self, data: dict, where: str):
+        try:
+            self.raw_json_file.write(_json_dumps(data, newline=True))
+        except Exception as e:
+            rprint(f"[orange3]Warning: Could not save raw JSON for {where}: {e}[orange3]")
+
+    def add_ads(self, records: list, where: str) -> bool:
+        """Write one page of ads to the output file. Returns False if the output could not be written."""
+        with self._lock:
+            try:
+                if self.writer is None:
+                    self.writer = self.writer_cls(self.file_basename, self.columns)
+                self.writer.write_page(records)
+            except Exception as e:
+                rprint(f"[red]Error writing {where} to {self.writer_cls.extension} output: {e}[red]")
+                self.write_failed = True
+                return False
+            self.total_ads += len(records)
+            self.data_fetched = True
+            rprint(f"[green]Fetched {len(records)} ads from {where}. Total ads so far: {self.total_ads}.[green]")
+            return True
+
+    def close_raw(self):
+        self._io_pool.shutdown(wait=True) # flush every queued page before closing the file
+        if self.raw_json_file is not None:
+            self.raw_json_file.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _calamine_available() -> bool:
+    """Whether pandas can use the calamine engine: python-calamine is installed and pandas >= 2.2 knows the engine."""
+    if importlib.util.find_spec('python_calamine') is None:
+        return False
+    import pandas as pd
+    try:
+        major, minor = (int(part) for part in pd.__version__.split('.')[:2])
+    except ValueError: # unusual version string, let pandas decide
+        return True
+    return (major, minor) >= (2, 2)
+
+def _read_excel(file_path: str, **kwargs):
+    """
+    Read an Excel sheet with the fast calamine (Rust) engine when it is available, else with
+    pandas' default engine (openpyxl for .xlsx). Read errors are not swallowed.
+    """
+    import pandas as pd
+    if _calamine_available():
+        return pd.read_excel(file_path, engine='calamine', **kwargs)
+    return pd.read_excel(file_path, **kwargs)
+
 
 class AdLibAPI:
     """
@@ -22,8 +313,21 @@ class AdLibAPI:
     """
     BASE_URL = 'https://graph.facebook.com/v22.0/ads_archive' # Base URL for the API
     
-    FIELDS = 'id, ad_delivery_start_time, ad_delivery_stop_time, ad_creative_bodies, ad_creative_link_captions, ad_creative_link_descriptions, ad_creative_link_titles, ad_snapshot_url, beneficiary_payers, languages, page_id, page_name, target_ages, target_gender, target_locations, eu_total_reach, age_country_gender_reach_breakdown'
+    FIELDS_TUPLE = ('id', 'ad_delivery_start_time', 'ad_delivery_stop_time', 'ad_creative_bodies', 'ad_creative_link_captions',
+                    'ad_creative_link_descriptions', 'ad_creative_link_titles', 'ad_snapshot_url', 'beneficiary_payers', 'languages',
+                    'page_id', 'page_name', 'target_ages', 'target_gender', 'target_locations', 'eu_total_reach',
+                    'age_country_gender_reach_breakdown')
+    FIELDS = ','.join(FIELDS_TUPLE) # No spaces, so nothing gets percent-encoded in every request URL
     LIMIT = '300' 
+    REQUESTS_PER_SECOND = 1 # Average request rate allowed towards the API (replaces the fixed 1s sleep)
+    REQUESTS_BURST = 3 # Number of requests that may be issued back to back before pacing kicks in
+    CACHE_DIR = os.path.join('output', '_cache') # Parsed inputs and API responses are cached here between runs
+    HTTP_CACHE_EXPIRE_AFTER = 3600 # Seconds a cached API response is reused when the same query is run again
+    PAGE_IDS_PER_QUERY = 10 # The API accepts at most 10 page IDs per search_page_ids query
+    MAX_CONCURRENT_QUERIES = 5 # Page ID chunks are downloaded in parallel, up to this many at a time
+    # Opt-in: treat a page with fewer ads than `limit` as the last one (saves the final request). The API does not
+    # promise full pages, so by default only a missing `paging.next` ends a query
+    STOP_ON_SHORT_PAGE = False
 
     def __init__(self, access_token: str, project_name: str = "default_project"):
         if not access_token:
@@ -38,16 +342,31 @@ class AdLibAPI:
             'limit': self.LIMIT 
         }
         self.data_path = f'output/{self.project_name}/ads_data'
-        if not os.path.exists(self.data_path):
-            try:
-                os.makedirs(self.data_path)
-                rprint(f"[green]Created directory: {self.data_path}[green]")
-            except OSError as e:
-                rprint(f"[red]Error creating directory {self.data_path}: {e}[red]")
-                # Decide if this is a critical error that should stop execution
-                raise
-
-    def read_excel_pages_id(self, file_name: str) -> list:
+        try:
+            os.makedirs(self.data_path, exist_ok=True)
+        except OSError as e:
+            rprint(f"[red]Error creating directory {self.data_path}: {e}[red]")
+            # Decide if this is a critical error that should stop execution
+            raise
+        self._rate_limiter = _RateLimiter(self.REQUESTS_PER_SECOND, self.REQUESTS_BURST)
+        # One session for all pages: keeps the TLS connection to graph.facebook.com alive and
+        # retries transient errors (rate limiting, 5xx) with exponential backoff
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+        self._session = requests.Session()
+        self._session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=retries))
+
+    def _page_ids_cache_path(self, file_path: str) -> str:
+        """Path of the cached page IDs for an Excel file, keyed by a hash of its content."""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return os.path.join(self.CACHE_DIR, f"page_ids_{digest.hexdigest()}.json")
+
+    def read_excel_pages_id(self, file_name: str, force_reload: bool = False) -> list:
         rprint(f"[cyan]Method read_excel_pages_id: Attempting to read Excel file: 'data/{file_name}'...[cyan]")
         page_ids_list = []
         # Assuming 'data' folder is in the current working directory from where AdDownloader is run
@@ -60,36 +379,58 @@ class AdLibAPI:
             if not os.path.exists(file_path):
                 rprint(f"[red]Method read_excel_pages_id: Error - Excel file '{file_path}' does not exist at the expected location.[red]")
                 return []
+
+            cache_path = self._page_ids_cache_path(file_path)
+            if not force_reload and os.path.exists(cache_path):
+                try:
+                    with open(cache_path, 'rb') as f:
+                        page_ids_list = _json_loads(f.read())
+                    rprint(f"[green]Method read_excel_pages_id: Loaded {len(page_ids_list)} page IDs for 'data/{file_name}' from cache ({cache_path}).[green]")
+                    return page_ids_list
+                except (OSError, ValueError) as e:
+                    rprint(f"[orange3]Method read_excel_pages_id: Could not read cache file {cache_path}: {e}. Re-reading the Excel file...[orange3]")
             
             rprint(f"[yellow]Method read_excel_pages_id: File 'data/{file_name}' exists. Attempting to read with pandas...[yellow]")
-            # This is the potentially slow part
-            df = pd.read_excel(file_path, sheet_name=0) 
-            rprint(f"[green]Method read_excel_pages_id: Pandas has finished reading 'data/{file_name}'. Processing data...[green]")
-            
-            if df.empty:
+            # First pass: read only the header row to find the page ID column
+            header = _read_excel(file_path, sheet_name=0, nrows=0)
+            if len(header.columns) == 0:
                 rprint(f"[orange3]Method read_excel_pages_id: Warning - Excel file 'data/{file_name}' is empty after reading.[orange3]")
                 return []
 
             id_col_name = None
             # Try to find a column named 'page_id' or 'Page ID' (case-insensitive)
-            for col in df.columns:
+            for col in header.columns:
                 if str(col).strip().lower() == 'page_id': # Added strip() for column names
                     id_col_name = col
                     rprint(f"[cyan]Method read_excel_pages_id: Found 'page_id' column: '{id_col_name}'[cyan]")
                     break
-            
-            if id_col_name:
-                page_ids_list = df[id_col_name].astype(str).str.strip().dropna().unique().tolist()
-            else:
+            if id_col_name is None:
                 rprint(f"[yellow]Method read_excel_pages_id: No 'page_id' column found. Using first column (index 0) for page IDs.[yellow]")
-                page_ids_list = df.iloc[:, 0].astype(str).str.strip().dropna().unique().tolist()
-            
-            # Filter out any potential empty strings or 'nan' strings that might have resulted from empty cells
-            page_ids_list = [pid for pid in page_ids_list if pid and pid.lower() != 'nan' and pid.strip()]
+
+            # Second pass: read only that column, already as strings (this is the potentially slow part)
+            df = _read_excel(file_path, sheet_name=0, usecols=[id_col_name if id_col_name is not None else 0], dtype=str)
+            rprint(f"[green]Method read_excel_pages_id: Pandas has finished reading 'data/{file_name}'. Processing data...[green]")
+
+            if df.empty:
+                rprint(f"[orange3]Method read_excel_pages_id: Warning - Excel file 'data/{file_name}' is empty after reading.[orange3]")
+                return []
+
+            # Vectorized clean-up: strip, drop empty cells and 'nan' strings, keep the first occurrence of each ID
+            ids = df.iloc[:, 0].astype('string').str.strip()
+            ids = ids[ids.notna() & (ids != '') & (ids.str.lower() != 'nan')]
+            page_ids_list = ids.unique().tolist()
             rprint(f"[cyan]Method read_excel_pages_id: Finished processing IDs. Found {len(page_ids_list)} unique, non-empty IDs.[cyan]")
 
             if page_ids_list:
                 rprint(f"[green]Method read_excel_pages_id: Successfully processed {len(page_ids_list)} unique page IDs from 'data/{file_name}'.[green]")
+                try:
+                    os.makedirs(self.CACHE_DIR, exist_ok=True)
+                    tmp_path = f"{cache_path}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(_json_dumps(page_ids_list))
+                    os.replace(tmp_path, cache_path) # atomic, so a crash never leaves a half-written cache
+                except OSError as e:
+                    rprint(f"[orange3]Method read_excel_pages_id: Could not write cache file {cache_path}: {e}[orange3]")
             else:
                 rprint(f"[orange3]Method read_excel_pages_id: No valid page IDs extracted from 'data/{file_name}'.[orange3]")
             
@@ -147,31 +488,99 @@ class AdLibAPI:
     def get_parameters(self) -> dict:
         return self.params
 
-    def start_download(self, output_format: str = "csv"):
-        all_ads_data = []
-        page_counter = 1
-        data_fetched_successfully = False
-
-        raw_json_dir = os.path.join(self.data_path, 'raw_json_responses')
-        if not os.path.exists(raw_json_dir):
-            try:
-                os.makedirs(raw_json_dir)
-            except OSError as e:
-                rprint(f"[red]Error creating raw JSON directory {raw_json_dir}: {e}[red]")
-                # Potentially stop if this dir is critical
-                return
-
+    def _response_cache_path(self, query: str) -> str:
+        """Cache file of an API response, keyed by its query string (including the cursor, excluding the token)."""
+        key = hashlib.sha256(query.encode('utf-8')).hexdigest()
+        return os.path.join(self.CACHE_DIR, 'http', f"{key}.json.gz")
 
-        current_params = self.params.copy() 
+    def _read_cached_response(self, cache_path: str):
+        """Return the cached response if it exists and is still fresh, else None."""
+        try:
+            if time.time() - os.path.getmtime(cache_path) > self.HTTP_CACHE_EXPIRE_AFTER:
+                return None
+            with gzip.open(cache_path, 'rb') as f:
+                content = f.read()
+            return _json_loads(content)
+        except (OSError, ValueError): # missing, unreadable or corrupted cache entry
+            return None
+
+    def _prune_response_cache(self):
+        """Delete cached API responses older than HTTP_CACHE_EXPIRE_AFTER, they are never read again."""
+        cache_dir = os.path.join(self.CACHE_DIR, 'http')
+        oldest_allowed = time.time() - self.HTTP_CACHE_EXPIRE_AFTER
+        try:
+            with os.scandir(cache_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file() and entry.stat().st_mtime < oldest_allowed:
+                            os.remove(entry.path)
+                    except OSError: # removed meanwhile or not removable, the cache is best effort
+                        pass
+        except OSError: # no cache directory yet
+            pass
+
+    def _write_cached_response(self, cache_path: str, data: dict):
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            content = _json_dumps(data)
+            tmp_path = f"{cache_path}.{threading.get_ident()}.tmp" # queries may run in parallel threads
+            with gzip.open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, cache_path)
+        except (OSError, TypeError, ValueError) as e:
+            rprint(f"[orange3]Warning: Could not cache API response in {cache_path}: {e}[orange3]")
+
+    def _fetch_page(self, query: str, use_cache: bool = False, sink: "_DownloadSink" = None) -> dict:
+        """
+        Request a single page from the API (or the response cache), respecting the rate limit. Raises on HTTP/JSON errors.
+        `query` is the already url-encoded query string without the access token. If a `sink` is given, new
+        responses are written to the cache on its background I/O thread instead of in the request thread.
+        """
+        cache_path = self._response_cache_path(query) if use_cache else None
+        if cache_path:
+            data = self._read_cached_response(cache_path)
+            if data is not None:
+                return data
+
+        self._rate_limiter.acquire()
+        response = self._session.get(f"{self.BASE_URL}?{query}&{urlencode({'access_token': self.access_token})}", timeout=60)
+        response.raise_for_status()
+        try:
+            data = _json_loads(response.content)
+        except ValueError: # orjson.JSONDecodeError is a ValueError too
+            rprint(f"[red]Response content (first 500 chars): {response.text[:500]}...[red]")
+            raise
+
+        if cache_path and isinstance(data, dict) and 'error' not in data:
+            if sink is not None:
+                sink.run_in_background(self._write_cached_response, cache_path, data)
+            else:
+                self._write_cached_response(cache_path, data)
+        return data
+
+    def _query_param_sets(self) -> list:
+        """Split the current parameters into independent queries of at most PAGE_IDS_PER_QUERY page IDs each."""
+        page_ids = [pid for pid in (self.params.get('search_page_ids') or '').split(',') if pid]
+        if len(page_ids) <= self.PAGE_IDS_PER_QUERY:
+            return [self.params.copy()]
+        return [{**self.params, 'search_page_ids': ','.join(page_ids[i:i + self.PAGE_IDS_PER_QUERY])}
+                for i in range(0, len(page_ids), self.PAGE_IDS_PER_QUERY)]
+
+    def _download_query(self, params: dict, sink: _DownloadSink, label: str = "", use_cache: bool = False):
+        """Follow the cursor pagination of a single query, passing every page to the sink."""
+        import requests
+        page_counter = 1
+        # The stable part of the query is url-encoded once; only the cursor changes from page to page
+        base_query = urlencode(sorted((k, v) for k, v in params.items() if k not in ('access_token', 'after') and v is not None), safe=',')
+        cursor = params.get('after')
 
-        while True:
-            rprint(f"[cyan]##### Starting reading page {page_counter} from API #####[cyan]")
+        while not (sink.write_failed or sink.cancelled):
+            where = f"{label}page {page_counter}"
+            rprint(f"[cyan]##### Starting reading {where} from API #####[cyan]")
             try:
-                response = requests.get(self.BASE_URL, params=current_params, timeout=60) 
-                response.raise_for_status() 
-                data = response.json()
+                data = self._fetch_page(f"{base_query}&after={quote(cursor, safe='')}" if cursor else base_query, use_cache, sink)
             except requests.exceptions.HTTPError as e:
-                rprint(f"[red]HTTP Error on page {page_counter}: {e.response.status_code} - {e.response.text[:500]}...[red]")
+                rprint(f"[red]HTTP Error on {where}: {e.response.status_code} - {e.response.text[:500]}...[red]")
                 api_error_content = {}
                 try:
                     api_error_content = e.response.json()
@@ -181,31 +590,31 @@ class AdLibAPI:
                      rprint(f"[red]API Error Message: {api_error_content['error']['message']}[red]")
                 break 
             except requests.exceptions.Timeout:
-                rprint(f"[red]Request timed out on page {page_counter}. Try increasing timeout or check network.[red]")
+                rprint(f"[red]Request timed out on {where}. Try increasing timeout or check network.[red]")
                 break
             except requests.exceptions.RequestException as e:
-                rprint(f"[red]Request failed on page {page_counter}: {e}[red]")
+                rprint(f"[red]Request failed on {where}: {e}[red]")
                 break
             except ValueError as e: # Includes JSONDecodeError
-                rprint(f"[red]Error decoding JSON response on page {page_counter}: {e}[red]")
-                if 'response' in locals() and response is not None: # Check if response object exists
-                    rprint(f"[red]Response content (first 500 chars): {response.text[:500]}...[red]")
+                rprint(f"[red]Error decoding JSON response on {where}: {e}[red]")
                 break
 
-            try:
-                with open(os.path.join(raw_json_dir, f'{self.project_name}_page_{page_counter}.json'), 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=4)
-            except Exception as e:
-                rprint(f"[orange3]Warning: Could not save raw JSON for page {page_counter}: {e}[orange3]")
+            sink.save_raw(data, where)
 
             if data.get('data'): 
-                all_ads_data.extend(data['data'])
-                data_fetched_successfully = True 
-                rprint(f"[green]Fetched {len(data['data'])} ads from page {page_counter}. Total ads so far: {len(all_ads_data)}.[green]")
+                if not sink.add_ads(data['data'], where):
+                    break
+                has_next = 'paging' in data and 'next' in data['paging']
+                if self.STOP_ON_SHORT_PAGE and len(data['data']) < int(params.get('limit') or self.LIMIT):
+                    if has_next:
+                        rprint(f"[orange3]Warning: {where} returned fewer ads than the page limit but has a next page; stopping here (STOP_ON_SHORT_PAGE), further ads of this query are not downloaded.[orange3]")
+                    else:
+                        rprint(f"[yellow]{where} returned fewer ads than the page limit. Download complete for this query.[yellow]")
+                    break
                 
-                if 'paging' in data and 'next' in data['paging']:
+                if has_next:
                     if 'cursors' in data['paging'] and 'after' in data['paging']['cursors']:
-                         current_params['after'] = data['paging']['cursors']['after']
+                         cursor = data['paging']['cursors']['after']
                          page_counter += 1
                     else: 
                          rprint("[yellow]No 'after' cursor in paging information. Assuming end of results by this method.[yellow]")
@@ -214,60 +623,115 @@ class AdLibAPI:
                     rprint("[yellow]No 'next' page in paging information. Download complete for this query.[yellow]")
                     break 
             else:
-                rprint(f"[orange3]No data in 'data' field on page {page_counter}.[orange3]")
+                rprint(f"[orange3]No data in 'data' field on {where}.[orange3]")
                 if "error" in data:
                     rprint(f"[red]API Error: {data['error'].get('message', 'Unknown error')}[red]")
                 elif not data: # Empty response
-                     rprint(f"[orange3]Empty response from API on page {page_counter}.[orange3]")
+                     rprint(f"[orange3]Empty response from API on {where}.[orange3]")
                 break 
 
-            time.sleep(1)
-
-        if not data_fetched_successfully:
-            rprint("[red]No ad data was successfully fetched from the API.[red]")
-            return
-
-        if not all_ads_data:
-            rprint("[orange3]No ad data was collected after processing all pages.[orange3]")
+    def start_download(self, output_format: str = "csv", use_cache: bool = False):
+        """
+        Download all ads matching the current parameters and save them to `output_format` ('csv', 'json' or 'xlsx').
+        With `use_cache` (opt-in), API responses are cached on disk and the ones younger than
+        HTTP_CACHE_EXPIRE_AFTER seconds are replayed when the same query is run again.
+        """
+        raw_json_dir = os.path.join(self.data_path, 'raw_json_responses')
+        try:
+            os.makedirs(raw_json_dir, exist_ok=True)
+        except OSError as e:
+            rprint(f"[red]Error creating raw JSON directory {raw_json_dir}: {e}[red]")
+            # Potentially stop if this dir is critical
             return
 
-        df_all_ads = pd.DataFrame(all_ads_data)
-        rprint(f"[green]Total ads collected: {len(df_all_ads)}[green]")
 
+        if output_format not in _ADS_WRITERS:
+            rprint(f"[red]Unsupported output format: {output_format}. Defaulting to CSV.[red]")
+            output_format = 'csv'
         file_basename = os.path.join(self.data_path, f"{self.project_name}_original_data")
-        output_path = ""
+        columns = [field.strip() for field in self.params.get('fields', self.FIELDS).split(',')]
 
+        # All raw pages go into one compressed newline-delimited JSON file (one API response per line)
+        raw_json_path = os.path.join(raw_json_dir, f'{self.project_name}.ndjson.gz')
+        try:
+            raw_json_file = gzip.open(raw_json_path, 'wb')
+        except OSError as e:
+            rprint(f"[orange3]Warning: Could not open {raw_json_path} for raw JSON responses: {e}[orange3]")
+            raw_json_file = None
+        sink = _DownloadSink(_ADS_WRITERS[output_format], file_basename, columns, raw_json_file)
+        if use_cache:
+            sink.run_in_background(self._prune_response_cache)
+
+        param_sets = self._query_param_sets()
+        completed = False
         try:
-            if output_format == 'csv':
-                output_path = f"{file_basename}.csv"
-                df_all_ads.to_csv(output_path, index=False, encoding='utf-8-sig')
-            elif output_format == 'json':
-                output_path = f"{file_basename}.json"
-                df_all_ads.to_json(output_path, orient='records', indent=4, force_ascii=False)
-            elif output_format == 'xlsx':
-                output_path = f"{file_basename}.xlsx"
-                df_all_ads.to_excel(output_path, index=False, engine='openpyxl')
+            if len(param_sets) == 1:
+                self._download_query(param_sets[0], sink, use_cache=use_cache)
             else:
-                rprint(f"[red]Unsupported output format: {output_format}. Defaulting to CSV.[red]")
-                output_path = f"{file_basename}.csv"
-                df_all_ads.to_csv(output_path, index=False, encoding='utf-8-sig')
-            
-            if output_path:
-                 rprint(f"[green bold]All ad data saved to {output_path}[green bold]")
+                # Page ID chunks are independent queries, so their (serial) cursor paging can run side by side.
+                # All threads share the session and the rate limiter.
+                rprint(f"[cyan]Splitting the page IDs into {len(param_sets)} queries of up to {self.PAGE_IDS_PER_QUERY} IDs each...[cyan]")
+                # No `with` block: its shutdown would wait for every chunk to page through to the end on Ctrl+C
+                pool = ThreadPoolExecutor(max_workers=min(self.MAX_CONCURRENT_QUERIES, len(param_sets)))
+                try:
+                    futures = [pool.submit(self._download_query, query_params, sink, f"query {i}/{len(param_sets)}, ", use_cache)
+                               for i, query_params in enumerate(param_sets, start=1)]
+                    for future in as_completed(futures):
+                        try:
+                            future.result()
+                        except Exception as e:
+                            rprint(f"[red]A query failed unexpectedly: {e}[red]")
+                except KeyboardInterrupt:
+                    rprint("[orange3]Download interrupted, stopping the running queries after their current page...[orange3]")
+                    sink.cancelled = True
+                    pool.shutdown(wait=True, cancel_futures=True) # queued chunks never start, running ones exit their loop
+                    raise
+                pool.shutdown(wait=True)
+            completed = True
+        finally:
+            # Also on errors and Ctrl+C: whatever was downloaded ends up in a valid, closed file
+            sink.close_raw()
+            self._close_output(sink, output_format, file_basename, completed)
+
+    def _close_output(self, sink: _DownloadSink, output_format: str, file_basename: str, completed: bool = True):
+        """Close the output writer of a download and report what was saved."""
+        writer = sink.writer
+        if writer is None:
+            if sink.write_failed:
+                rprint(f"[bold red]Could not create the {output_format} output file in {self.data_path}.[bold red]")
+            elif not sink.data_fetched:
+                rprint("[red]No ad data was successfully fetched from the API.[red]")
+            else:
+                rprint("[orange3]No ad data was collected after processing all pages.[orange3]")
+            return
 
+        rprint(f"[green]Total ads collected: {sink.total_ads}[green]")
+
+        try:
+            writer.close()
+            if not completed:
+                rprint(f"[orange3]The download stopped early, {writer.rows_written} ads were saved to {writer.path}.[orange3]")
+            elif sink.write_failed:
+                rprint(f"[orange3]Only the first {writer.rows_written} ads could be saved to {writer.path}.[orange3]")
+            else:
+                rprint(f"[green bold]All ad data saved to {writer.path}[green bold]")
+            if getattr(writer, 'overflow_path', None):
+                rprint(f"[orange3]The ads past Excel's row limit are in {writer.overflow_path}.[orange3]")
         except Exception as e:
-             rprint(f"[red]Error saving data to {output_format} at {output_path}: {e}[red]")
-             rprint(f"[orange3]Attempting to save as CSV fallback...[orange3]")
-             try:
-                 output_path_csv_fallback = f"{file_basename}_fallback.csv"
-                 df_all_ads.to_csv(output_path_csv_fallback, index=False, encoding='utf-8-sig')
-                 rprint(f"[green bold]Fallback data saved to {output_path_csv_fallback}[green bold]")
-             except Exception as fb_e:
-                 rprint(f"[bold red]Failed to save data even as CSV fallback: {fb_e}[bold red]")
+             rprint(f"[red]Error saving data to {output_format} at {writer.path}: {e}[red]")
+             if isinstance(writer, _XlsxAdsWriter) and writer.is_buffered: # the only writer that still holds all rows in memory
+                 rprint(f"[orange3]Attempting to save as CSV fallback...[orange3]")
+                 try:
+                     output_path_csv_fallback = f"{file_basename}_fallback.csv"
+                     writer.to_dataframe().to_csv(output_path_csv_fallback, index=False, encoding='utf-8-sig')
+                     rprint(f"[green bold]Fallback data saved to {output_path_csv_fallback}[green bold]")
+                 except Exception as fb_e:
+                     rprint(f"[bold red]Failed to save data even as CSV fallback: {fb_e}[bold red]")
 
 
 if __name__ == '__main__':
     # Example usage (for testing this module directly)
+    import pandas as pd
     if not os.path.exists("data"):
         os.makedirs("data")
     dummy_excel_data = {'page_id': ['12345', '67890', ' ', None, 'nan']} # Added more test cases
@@ -5,16 +5,32 @@ import typer
 import inquirer3 # Main import
 from inquirer3.errors import ValidationError as InquirerValidationError # Import for PageIDValidator
 from inquirer3.themes import load_theme_from_dict
-from rich import print as rprint
+from rich.console import Console
+import sys
 import time
-import pandas as pd
+import traceback
+import csv
+import random
+import functools
+from typing import Optional, Tuple, TYPE_CHECKING
 import os
 from loguru import logger
 
+if TYPE_CHECKING: # pandas is only needed once Task B reads the ads data, it is imported there
+    import pandas as pd
+
 from AdDownloader.adlib_api import AdLibAPI
 from AdDownloader.media_download import start_media_download
 # PageIDValidator is defined locally in this file, so it's removed from helpers import
-from AdDownloader.helpers import NumberValidator, DateValidator, CountryValidator, update_access_token, configure_logging, close_logger
+from AdDownloader.helpers import NumberValidator, DateValidator, CountryValidator, update_access_token, configure_logging, close_logger, LOGURU_HANDLERS, _DEBUG
+
+# One console for the whole CLI, when stdout is piped or redirected (CI, log files) colors are dropped instead of rendered
+_IS_TTY = sys.stdout is not None and sys.stdout.isatty()
+_console = Console(highlight=False, soft_wrap=True) if _IS_TTY else Console(highlight=False, soft_wrap=True, no_color=True, force_terminal=False)
+rprint = _console.print
+
+# AdDownloader.start_app (dash) is imported on the first Task D only, then kept here for later re-runs
+_start_gui = None
 
 # Theme for inquirer3 prompts
 default_style = load_theme_from_dict(
@@ -25,45 +41,136 @@ default_style = load_theme_from_dict(
 )
 
 # Validator for comma-separated Page IDs - defined locally in cli.py
+# Validation diagnostics go to the log (debug level, only with ADDOWNLOADER_DEBUG=1) instead of the console
+_page_id_logger = logger.bind(component="PageIDValidator")
+
+@functools.lru_cache(maxsize=128)
+def _validate_page_ids_cached(current: str) -> Tuple[bool, Optional[str], Tuple[str, ...]]:
+    """Pure part of the Page ID validation, memoized on the raw input string. Returns (ok, reason, parsed_ids)."""
+    current_stripped = current.strip()
+    if not current_stripped:
+        if _DEBUG:
+            _page_id_logger.debug("Validation fail: Page IDs input is empty.")
+        return False, "VALIDATOR FAIL: Page IDs cannot be empty if chosen as search method.", ()
+    
+    # Split by comma, strip whitespace from each potential ID and drop empty strings
+    # that might result from multiple commas (e.g., "123,,456") or trailing commas
+    actual_ids_to_check = [pid for pid in (pid.strip() for pid in current_stripped.split(',')) if pid]
+    
+    if not actual_ids_to_check: # If list is empty after filtering (e.g., input was ",," or just " ")
+        if _DEBUG:
+            _page_id_logger.debug(f"Validation fail: no Page IDs left after splitting '{current}'.")
+        return False, "VALIDATOR FAIL: Please provide at least one valid Page ID.", ()
+
+    for pid_to_check in actual_ids_to_check:
+        if not pid_to_check.isdigit():
+            if _DEBUG:
+                _page_id_logger.debug(f"Validation fail: ID '{pid_to_check}' is not composed of only digits.")
+            return False, f"VALIDATOR FAIL: Page ID '{pid_to_check}' is not valid. All Page IDs must be numbers (e.g., '12345' or '123,456').", ()
+    
+    return True, None, tuple(actual_ids_to_check) # tuple: the cached value must not be mutated by callers
+
 class PageIDValidator:
     @staticmethod
     def validate_page_ids(answers, current):
-        rprint(f"\n[PageIDValidator] Received for Page IDs: '{current}' (Type: {type(current)})")
-        current_stripped = current.strip()
-        if not current_stripped:
-            rprint("[PageIDValidator] Validation Fail: Page IDs cannot be empty.")
+        ok, reason, parsed_ids = _validate_page_ids_cached(current)
+        if not ok:
             # For inquirer3, an empty message string for ValidationError is fine if 'reason' is used by theme/handler
-            raise InquirerValidationError("", reason="VALIDATOR FAIL: Page IDs cannot be empty if chosen as search method.")
-        
-        # Split by comma and strip whitespace from each potential ID
-        ids = [pid.strip() for pid in current_stripped.split(',')]
-        rprint(f"[PageIDValidator] IDs after split and strip: {ids}")
-
-        # Filter out any empty strings that might result from multiple commas (e.g., "123,,456") or trailing commas
-        actual_ids_to_check = [pid for pid in ids if pid] # Keeps only non-empty strings
-        
-        if not actual_ids_to_check: # If list is empty after filtering (e.g., input was ",," or just " ")
-            rprint("[PageIDValidator] Validation Fail: No actual Page IDs provided after stripping and splitting.")
-            raise InquirerValidationError("", reason="VALIDATOR FAIL: Please provide at least one valid Page ID.")
-
-        for pid_to_check in actual_ids_to_check:
-            if not pid_to_check.isdigit():
-                rprint(f"[PageIDValidator] Validation Fail: ID '{pid_to_check}' is not composed of only digits.")
-                raise InquirerValidationError("", reason=f"VALIDATOR FAIL: Page ID '{pid_to_check}' is not valid. All Page IDs must be numbers (e.g., '12345' or '123,456').")
-        
-        rprint("[PageIDValidator] Page IDs validation passed.")
+            raise InquirerValidationError("", reason=reason)
+        # 'answers' is the running inquirer3 answers dict, keep the parsed IDs there so run_task_A does not parse them again
+        if isinstance(answers, dict):
+            answers['_parsed_page_ids'] = list(parsed_ids)
         return True
 
+# Columns used by the media download (start_media_download) and update_access_token
+_MEDIA_DOWNLOAD_COLUMNS = ("id", "ad_snapshot_url")
+# Fixed choices of the "how many ads" prompt in Task B, the custom and 'E - All (N)' options are resolved separately
+_OPTION_TO_N = {'A - 50': 50, 'B - 100': 100, 'C - 200': 200}
+
+def _find_ads_file(project_name: str) -> Optional[str]:
+    """Return the path of the project's ads data file (CSV preferred over Excel) from a single directory listing, or None."""
+    base = f'output/{project_name}/ads_data'
+    stem = f'{project_name}_original_data'
+    try:
+        with os.scandir(base) as entries:
+            names = {entry.name for entry in entries if entry.is_file()}
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    for ext in ('.csv', '.xlsx'): # CSV first: it parses far faster than Excel
+        if stem + ext in names:
+            return f'{base}/{stem}{ext}'
+    return None
+
+def _fast_rowcount(file_path: str) -> int:
+    """Count the data rows of a CSV or Excel ads file without loading it into a DataFrame."""
+    if file_path.endswith('.csv'):
+        # csv.reader rather than counting b'\n': ad texts often contain line breaks inside quoted fields
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+    import openpyxl
+    workbook = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        worksheet = workbook.worksheets[0]
+        nr_rows = worksheet.max_row # read from the sheet dimensions, may be missing in files not written by Excel/openpyxl
+        if nr_rows is None:
+            nr_rows = sum(1 for _ in worksheet.iter_rows(values_only=True))
+        return max(nr_rows - 1, 0)
+    finally:
+        workbook.close()
+
+def _read_ads_data(file_path: str, rows: Optional[set] = None) -> 'pd.DataFrame':
+    """
+    Load only the columns needed for the media download from a CSV or Excel ads data file.
+    If `rows` is given, only those data rows (1-based, the header being row 0) are parsed.
+    """
+    import pandas as pd
+    is_csv = file_path.endswith('.csv')
+    header = pd.read_csv(file_path, nrows=0) if is_csv else pd.read_excel(file_path, nrows=0)
+    usecols = [col for col in header.columns if col in _MEDIA_DOWNLOAD_COLUMNS] or None # None: keep everything if the file has other column names
+    skiprows = (lambda i: i != 0 and i not in rows) if rows is not None else None
+    if not is_csv:
+        return pd.read_excel(file_path, usecols=usecols, skiprows=skiprows)
+    dtype = {"id": "string"} if usecols and "id" in usecols else None
+    if skiprows is None:
+        try:
+            return pd.read_csv(file_path, usecols=usecols, dtype=dtype, engine="pyarrow")
+        except (ImportError, ValueError): # pyarrow not installed or not able to parse this file
+            pass
+    return pd.read_csv(file_path, usecols=usecols, dtype=dtype, skiprows=skiprows) # the pyarrow engine has no callable skiprows
+
+# Prompt questions that do not depend on runtime state are built once, inquirer3 questions can be re-rendered
+_PARAMS_QUESTIONS_HEAD = [
+    inquirer3.List("ad_type", message="What type of ads do you want to search?", choices=['All', 'Political/Elections'], default='All'),
+    inquirer3.Text("ad_reached_countries", message="What reached countries? (Codes, comma-separated, e.g., US,GB. Default 'NL')", validate=CountryValidator.validate_country, default="NL"),
+    inquirer3.Text("ad_delivery_date_min", message="Min ad delivery date? (YYYY-MM-DD, default '2023-01-01')", validate=DateValidator.validate_date, default='2023-01-01'),
+]
+_PARAMS_QUESTIONS_TAIL = [
+    inquirer3.List("search_by", message="Search by specific Page IDs or by search terms?", choices=['Enter Page IDs directly', 'Search Terms'], default='Search Terms'),
+    inquirer3.Text("search_page_ids_direct", message="Page IDs, comma-separated:", ignore=lambda answers: answers.get('search_by') != 'Enter Page IDs directly', validate=PageIDValidator.validate_page_ids),
+    inquirer3.Text("search_terms", message="Search terms, comma-separated:", ignore=lambda answers: answers.get('search_by') != 'Search Terms', validate=lambda _, current: True if current.strip() else "Search terms cannot be empty if this search method is chosen.")
+]
+_CUSTOM_ADS_NR_QUESTION = inquirer3.Text("custom_ads_nr", message="Custom number of ads for media download:", ignore=lambda ans: ans.get('nr_ads_option') != 'D - Custom number', validate=NumberValidator.validate_number, default='10')
+_MAIN_MENU_QUESTIONS = [
+    inquirer3.List("task", message="Welcome to the AdDownloader! Select the task you want to perform:", choices=['A - Ads data only', 'B - Media content only', 'C - Both data and media', 'D - Open dashboard'], default='A - Ads data only'),
+    inquirer3.Password("access_token", message='Meta Ad Library access token (Required for Tasks A, B, C - Press Enter if only doing Task D):', 
+                       validate=lambda ans, token_str: (True if ans.get('task') == 'D - Open dashboard' else (True if token_str.strip() and len(token_str.strip()) > 10 else "Access token is required for this task and appears to be missing or too short.")),
+                       ignore=lambda answers: answers.get('task') == 'D - Open dashboard' # Only ignore if task D is chosen
+                       ),
+    # Asked in the same prompt (one render pass), only for the tasks that need a project
+    inquirer3.Text("project_name", message="Please enter a name for your project (e.g., 'my_ad_research'):", 
+                   validate=lambda _, x: True if x.strip() else "Project name cannot be empty.",
+                   ignore=lambda answers: answers.get('task') == 'D - Open dashboard'),
+    inquirer3.Confirm("start", message="Are you sure you want to proceed?", default=True),
+]
+_RERUN_QUESTIONS = [inquirer3.Confirm("rerun", message="Do you want to perform a new analysis?", default=False)]
+
 def request_params_task_AC():
     """Prompt user for additional parameters for API request in tasks A and C."""
+    today = time.strftime('%Y-%m-%d') # computed once so the default shown and the value used agree even across midnight
     add_questions = [
-        inquirer3.List("ad_type", message="What type of ads do you want to search?", choices=['All', 'Political/Elections'], default='All'),
-        inquirer3.Text("ad_reached_countries", message="What reached countries? (Codes, comma-separated, e.g., US,GB. Default 'NL')", validate=CountryValidator.validate_country, default="NL"),
-        inquirer3.Text("ad_delivery_date_min", message="Min ad delivery date? (YYYY-MM-DD, default '2023-01-01')", validate=DateValidator.validate_date, default='2023-01-01'),
-        inquirer3.Text("ad_delivery_date_max", message="Max ad delivery date? (YYYY-MM-DD, default today)", validate=DateValidator.validate_date, default=time.strftime('%Y-%m-%d')),
-        inquirer3.List("search_by", message="Search by specific Page IDs or by search terms?", choices=['Enter Page IDs directly', 'Search Terms'], default='Search Terms'),
-        inquirer3.Text("search_page_ids_direct", message="Page IDs, comma-separated:", ignore=lambda answers: answers.get('search_by') != 'Enter Page IDs directly', validate=PageIDValidator.validate_page_ids),
-        inquirer3.Text("search_terms", message="Search terms, comma-separated:", ignore=lambda answers: answers.get('search_by') != 'Search Terms', validate=lambda _, current: True if current.strip() else "Search terms cannot be empty if this search method is chosen.")
+        *_PARAMS_QUESTIONS_HEAD,
+        inquirer3.Text("ad_delivery_date_max", message="Max ad delivery date? (YYYY-MM-DD, default today)", validate=DateValidator.validate_date, default=today),
+        *_PARAMS_QUESTIONS_TAIL,
     ]
     rprint("[yellow]Configuring search parameters for Task A/C...[yellow]")
     answers = inquirer3.prompt(add_questions, theme=default_style)
@@ -79,6 +186,7 @@ def run_task_A(project_name: str, answers_main_task: dict):
         logger.error("Task A aborted: Project name was empty.")
         return
     logger.info(f"Starting Task A for project: {project_name}")
+    today = time.strftime('%Y-%m-%d')
 
     access_token = answers_main_task.get('access_token')
     if not access_token: # Should be caught by AdLibAPI init, but good to check early
@@ -98,9 +206,11 @@ def run_task_A(project_name: str, answers_main_task: dict):
     page_ids_to_pass, search_terms_to_pass = None, None
 
     if search_by == 'Enter Page IDs directly':
-        raw_page_ids_str = param_answers.get('search_page_ids_direct', "")
-        # Validator should ensure this is fine, but double check parsing
-        page_ids_to_pass = [pid.strip() for pid in raw_page_ids_str.split(',') if pid.strip().isdigit()]
+        # Parsed by PageIDValidator during the prompt, re-validated here only if the answers did not come through it
+        page_ids_to_pass = param_answers.get('_parsed_page_ids')
+        if not page_ids_to_pass:
+            ok, _, parsed_ids = _validate_page_ids_cached(param_answers.get('search_page_ids_direct') or "")
+            page_ids_to_pass = list(parsed_ids) if ok else []
         if not page_ids_to_pass:
             rprint("[red]No valid numerical Page IDs provided after parsing for 'Enter Page IDs directly' search. Aborting Task A.[red]")
             logger.error("Task A failed: No valid numerical Page IDs after parsing direct input.")
@@ -117,7 +227,7 @@ def run_task_A(project_name: str, answers_main_task: dict):
     ads.add_parameters(
         ad_reached_countries=param_answers.get('ad_reached_countries', "NL"),
         ad_delivery_date_min=param_answers.get('ad_delivery_date_min', '2023-01-01'),
-        ad_delivery_date_max=param_answers.get('ad_delivery_date_max', time.strftime('%Y-%m-%d')),
+        ad_delivery_date_max=param_answers.get('ad_delivery_date_max', today),
         search_page_ids=page_ids_to_pass,
         search_terms=search_terms_to_pass,
         ad_type="ALL" if ad_type == 'All' else "POLITICAL_AND_ISSUE_ADS"
@@ -127,16 +237,19 @@ def run_task_A(project_name: str, answers_main_task: dict):
     logger.info(f"API Parameters for Task A: {ads.get_parameters()}")
 
     rprint("[yellow]Ad data download will begin now for Task A.[yellow]")
-    start_time = time.time()
+    start_time = time.perf_counter() # monotonic and high resolution, unlike time.time()
     ads.start_download() # Consider prompting for output_format or getting from config
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    minutes, seconds = divmod(int(elapsed_time), 60)
-    rprint(f"Task A data download finished in {minutes} minutes and {seconds} seconds.")
-    logger.info(f"Task A download finished in {minutes}m {seconds}s.")
-
-def run_task_B(project_name: str, answers_main_task: dict):
-    """Runs Task B: Download media content."""
+    elapsed_time = time.perf_counter() - start_time
+    if elapsed_time < 60:
+        rprint(f"Task A data download finished in {elapsed_time:.2f} seconds.")
+        logger.info(f"Task A download finished in {elapsed_time:.2f}s.")
+    else:
+        minutes, seconds = divmod(int(elapsed_time), 60)
+        rprint(f"Task A data download finished in {minutes} minutes and {seconds} seconds.")
+        logger.info(f"Task A download finished in {minutes}m {seconds}s.")
+
+def run_task_B(project_name: str, answers_main_task: dict, data_path: Optional[str] = None):
+    """Runs Task B: Download media content. `data_path` skips the file lookup when the caller already found the ads data file."""
     if not project_name or not project_name.strip():
         rprint("[red]Project name cannot be empty for Task B.[red]")
         logger.error("Task B aborted: Project name was empty.")
@@ -148,40 +261,24 @@ def run_task_B(project_name: str, answers_main_task: dict):
         file_path_xlsx = f'{output_data_path}.xlsx'
         file_path_csv = f'{output_data_path}.csv'
         
-        data_df = None
-        used_file_path = ""
-
-        if os.path.exists(file_path_xlsx):
-            used_file_path = file_path_xlsx
-            rprint(f"[yellow]Reading data from Excel for Task B: {used_file_path}[yellow]")
-            data_df = pd.read_excel(used_file_path)
-        elif os.path.exists(file_path_csv):
-            used_file_path = file_path_csv
-            rprint(f"[yellow]Reading data from CSV for Task B: {used_file_path}[yellow]")
-            data_df = pd.read_csv(used_file_path)
-        else:
+        used_file_path = data_path or _find_ads_file(project_name)
+        if not used_file_path:
             rprint(f"[red]Error: Ads data file not found for project '{project_name}'.[red]")
             rprint(f"[red]Expected at '{file_path_xlsx}' or '{file_path_csv}'. Please run Task A or C first.[red]")
             logger.error(f"Ads data file not found for Task B: {file_path_xlsx} or {file_path_csv}")
             return
         
-        if data_df.empty:
+        # Only count the rows for now, the data itself is loaded once we know how many ads are needed
+        total_ads = _fast_rowcount(used_file_path)
+        if total_ads == 0:
             rprint(f"[orange3]The ads data file ('{used_file_path}') is empty. No media to download for Task B.[orange3]")
             logger.warning(f"Ads data file for Task B ('{used_file_path}') is empty.")
             return
-        total_ads = len(data_df)
-
-        access_token_for_update = answers_main_task.get('access_token')
-        if access_token_for_update:
-             data_df = update_access_token(data_df, access_token_for_update)
-        else:
-            rprint("[orange3]Access token not found/empty in main task answers. Snapshot URLs may not be updated for media download.[orange3]")
-            logger.warning("Access token not available in main task answers for Task B media download URL update.")
        
         rprint("[yellow]Starting media content download process for Task B...[yellow]")
         questions_down = [
             inquirer3.List("nr_ads_option", message=f"Found {total_ads} ads in '{used_file_path}'. Download media for how many?", choices=['A - 50', 'B - 100', 'C - 200', 'D - Custom number', f'E - All ({total_ads})'], default='A - 50'),
-            inquirer3.Text("custom_ads_nr", message="Custom number of ads for media download:", ignore=lambda ans: ans.get('nr_ads_option') != 'D - Custom number', validate=NumberValidator.validate_number, default='10'),
+            _CUSTOM_ADS_NR_QUESTION,
         ]
         answers_down = inquirer3.prompt(questions_down, theme=default_style)
         if not answers_down:
@@ -189,41 +286,47 @@ def run_task_B(project_name: str, answers_main_task: dict):
             logger.warning("Task B aborted: Media download configuration cancelled by user.")
             return
             
-        nr_ads_str = answers_down.get("nr_ads_option")
-        nr_ads_to_download = 0
-        if nr_ads_str == 'A - 50': nr_ads_to_download = 50
-        elif nr_ads_str == 'B - 100': nr_ads_to_download = 100
-        elif nr_ads_str == 'C - 200': nr_ads_to_download = 200
-        elif nr_ads_str == f'E - All ({total_ads})': nr_ads_to_download = total_ads
-        elif nr_ads_str == 'D - Custom number':
+        nr_ads_str = answers_down.get("nr_ads_option") or ""
+        nr_ads_to_download = _OPTION_TO_N.get(nr_ads_str, 0)
+        if nr_ads_str.startswith('E -'):
+            nr_ads_to_download = total_ads
+        elif nr_ads_str.startswith('D -'):
             try: nr_ads_to_download = int(answers_down.get("custom_ads_nr", 0))
-            except ValueError: rprint("[red]Invalid custom number for media download. Defaulting to 0.[red]")
+            except (TypeError, ValueError): rprint("[red]Invalid custom number for media download. Defaulting to 0.[red]")
         
         if nr_ads_to_download <= 0:
             rprint("[orange3]Number of ads for media download must be greater than 0.[orange3]")
             logger.warning(f"Task B: Invalid number of ads selected for media download: {nr_ads_to_download}")
             return
         nr_ads_to_download = min(nr_ads_to_download, total_ads) 
+
+        # start_media_download samples the ads at random, so parse a random subset of rows rather than the whole file
+        rows_to_load = set(random.sample(range(1, total_ads + 1), nr_ads_to_download)) if nr_ads_to_download < total_ads else None
+        rprint(f"[yellow]Reading data for Task B: {used_file_path}[yellow]")
+        data_df = _read_ads_data(used_file_path, rows=rows_to_load)
+        if data_df.empty:
+            rprint(f"[orange3]The ads data file ('{used_file_path}') is empty. No media to download for Task B.[orange3]")
+            logger.warning(f"Ads data file for Task B ('{used_file_path}') is empty.")
+            return
+        nr_ads_to_download = min(nr_ads_to_download, len(data_df))
+
+        access_token_for_update = answers_main_task.get('access_token')
+        if access_token_for_update:
+            data_df = update_access_token(data_df, access_token_for_update) # runs on the already trimmed frame
+        else:
+            rprint("[orange3]Access token not found/empty in main task answers. Snapshot URLs may not be updated for media download.[orange3]")
+            logger.warning("Access token not available in main task answers for Task B media download URL update.")
         
         logger.info(f"Task B: Attempting to download media for {nr_ads_to_download} ads from project '{project_name}'.")
         start_media_download(project_name, nr_ads=nr_ads_to_download, data=data_df) # Pass dataframe
         logger.info(f"Task B: Media download process initiated for {nr_ads_to_download} ads.")
     except Exception as e:
         rprint(f"[bold red]An unexpected error occurred in Task B: {e}[bold red]")
-        import traceback
         logger.error(f"Task B unexpected error: {e}\n{traceback.format_exc()}")
 
 def intro_messages():
     """Display introductory messages and gather user input for the selected task."""
-    questions = [
-        inquirer3.List("task", message="Welcome to the AdDownloader! Select the task you want to perform:", choices=['A - Ads data only', 'B - Media content only', 'C - Both data and media', 'D - Open dashboard'], default='A - Ads data only'),
-        inquirer3.Password("access_token", message='Meta Ad Library access token (Required for Tasks A, B, C - Press Enter if only doing Task D):', 
-                           validate=lambda ans, token_str: (True if ans.get('task') == 'D - Open dashboard' else (True if token_str.strip() and len(token_str.strip()) > 10 else "Access token is required for this task and appears to be missing or too short.")),
-                           ignore=lambda answers: answers.get('task') == 'D - Open dashboard' # Only ignore if task D is chosen
-                           ),
-        inquirer3.Confirm("start", message="Are you sure you want to proceed?", default=True),
-    ]
-    answers_main_task = inquirer3.prompt(questions, theme=default_style)
+    answers_main_task = inquirer3.prompt(_MAIN_MENU_QUESTIONS, theme=default_style)
 
     if not answers_main_task or not answers_main_task.get('start'):
         rprint("[orange3]Operation cancelled by user at main prompt.[orange3]")
@@ -235,19 +338,18 @@ def intro_messages():
     logger.info(f"User selected task: {task_choice}")
 
     project_name = ""
-    # Ask for project name only if a task requiring it is selected
+    # The project name is only asked (and required) for the tasks that need it
     if task_choice in ['A - Ads data only', 'B - Media content only', 'C - Both data and media']:
-        name_questions = [inquirer3.Text("project_name", message="Please enter a name for your project (e.g., 'my_ad_research'):", 
-                                           validate=lambda _, x: True if x.strip() else "Project name cannot be empty.")]
-        name_answer = inquirer3.prompt(name_questions, theme=default_style)
-        if not name_answer or not name_answer.get('project_name'):
+        raw_project_name = (answers_main_task.get('project_name') or "").strip()
+        if not raw_project_name:
             rprint("[red]Project name not provided. Aborting.[red]")
             logger.error("Project name not provided by user.")
             return None 
-        project_name = name_answer.get('project_name').strip().replace(" ", "_") # Sanitize project name
+        project_name = raw_project_name.replace(" ", "_") # Sanitize project name
         logger.info(f"Project name set to: {project_name}")
         # Configure logging as soon as project name is available and valid for these tasks
-        configure_logging(project_name) 
+        if project_name not in LOGURU_HANDLERS: # already logging to this project's file (re-run of the same project)
+            configure_logging(project_name)
     
     answers_main_task['project_name'] = project_name 
     return answers_main_task
@@ -265,6 +367,7 @@ def run_analysis():
     Main entry point to start the AdDownloader interactive tasks.
     This function will be executed when `AdDownloader` is run.
     """
+    global _start_gui
     rprint("[bold blue]AdDownloader Initialized.[/bold blue]")
     # Initial general logging (before project name is known) can be configured here if needed
     # For example, to ensure logs go somewhere even if user cancels before project name:
@@ -287,11 +390,10 @@ def run_analysis():
                 run_task_B(project_name, main_task_details)
             elif task_choice == 'C - Both data and media':
                 run_task_A(project_name, main_task_details)
-                # Check if Task A produced data before proceeding to Task B
-                ads_data_file_xlsx = f'output/{project_name}/ads_data/{project_name}_original_data.xlsx'
-                ads_data_file_csv = f'output/{project_name}/ads_data/{project_name}_original_data.csv'
-                if project_name and (os.path.exists(ads_data_file_xlsx) or os.path.exists(ads_data_file_csv)):
-                    run_task_B(project_name, main_task_details)
+                # Check if Task A produced data before proceeding to Task B, the found file is handed over so it is not looked up again
+                data_path = _find_ads_file(project_name) if project_name else None
+                if data_path:
+                    run_task_B(project_name, main_task_details, data_path=data_path)
                 elif project_name: # project_name was given, but files don't exist
                     rprint(f"[red]Task A (data download) did not produce an output file for project '{project_name}'. Skipping media download (Task B).[red]")
                     logger.error(f"Task A failed for project '{project_name}', skipping Task B for combined Task C.")
@@ -300,8 +402,9 @@ def run_analysis():
                 rprint("[yellow]The dashboard feature might require additional dependencies (like 'dash').[yellow]")
                 rprint("[yellow]Attempting to start dashboard... Press Ctrl+C in the terminal to close it.[yellow]")
                 try:
-                    from AdDownloader.start_app import start_gui 
-                    start_gui(project_name_for_dashboard=project_name if project_name else None) # Pass project_name if available
+                    if _start_gui is None:
+                        from AdDownloader.start_app import start_gui as _start_gui
+                    _start_gui(project_name_for_dashboard=project_name if project_name else None) # Pass project_name if available
                     logger.info("Dashboard started.")
                 except ImportError:
                     rprint("[red]Dashboard components (AdDownloader.start_app) not found or 'dash' dependencies might be missing.[red]")
@@ -313,8 +416,7 @@ def run_analysis():
             rprint("\n[yellow]----------------------------------------------------[yellow]")
             rprint("[green]Current task set finished.[green]")
             
-            confirm_questions = [inquirer3.Confirm("rerun", message="Do you want to perform a new analysis?", default=False)]
-            rerun_answer = inquirer3.prompt(confirm_questions, theme=default_style)
+            rerun_answer = inquirer3.prompt(_RERUN_QUESTIONS, theme=default_style)
             if not rerun_answer or not rerun_answer.get('rerun'):
                 rprint("[bold blue]Exiting AdDownloader. Thank you for using the tool![/bold blue]")
                 logger.info("User chose to end analysis session.")
@@ -327,7 +429,6 @@ def run_analysis():
         logger.warning("Operation cancelled by KeyboardInterrupt in main loop.")
     except Exception as e:
         rprint(f"[bold red]An unexpected critical error occurred in the main application loop: {e}[bold red]")
-        import traceback
         logger.critical(f"Main application loop critical error: {e}\n{traceback.format_exc()}")
     finally:
         close_logger() # Call to allow loguru to flush handlers, etc.
@@ -338,6 +439,5 @@ if __name__ == "__main__":
     # Basic logger for direct script run if configure_logging isn't hit early by tasks
     logger.remove() # Remove default handlers
     logger.add(sys.stderr, level="INFO") # Add a simple stderr logger for direct script test
-    import sys
     
     app()
\ No newline at end of file
@@ -6,50 +6,99 @@ including input validators, utility functions, and logging configuration.
 
 import os
 import re
-import pandas as pd
+import queue
+import logging
+import logging.handlers
+import zipfile
+import xml.etree.ElementTree as ET
+import functools
+from typing import Optional, Tuple, TYPE_CHECKING
 from datetime import datetime
-import inquirer3 # Main import for inquirer3
-from inquirer3.errors import ValidationError # Correct import for the exception
+from inquirer3.errors import ValidationError # Correct import for the exception (small module, inquirer3 itself is not needed here)
 from rich import print as rprint # For rich console output
 from loguru import logger # For logging
 
+if TYPE_CHECKING: # pandas is imported where it is used, it is slow to import and most helpers never need it
+    import pandas as pd
+
+# Diagnostic (non-error) console output, e.g. the step-by-step messages of ExcelValidator
+_DEBUG = os.environ.get("ADDOWNLOADER_DEBUG") == "1"
+
+# Compiled once instead of going through the re module's pattern cache on every call/row
+_DATE_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})$')
+_MDAYS = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31) # days per month in a non-leap year, 1-based
+
 # --- Logging Configuration ---
 LOGURU_HANDLERS = {}
+LOG_QUEUE_SIZE = 10_000 # max log lines waiting to be written to the log file
 
-def configure_logging(project_name: str, log_level: str = "INFO"):
-    global LOGURU_HANDLERS
-    for handler_id in list(LOGURU_HANDLERS.keys()):
+class _BoundedQueueSink:
+    """
+    File-like loguru sink: formatted messages go to a bounded queue, drained by a background thread into a rotating log file.
+    Unlike loguru's enqueue=True (unbounded queue), lines are dropped and counted when the writer can't keep up.
+    """
+    def __init__(self, log_file_path: str, maxsize: int = LOG_QUEUE_SIZE):
+        self.log_file_path = log_file_path
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+        file_handler = logging.handlers.RotatingFileHandler(log_file_path, maxBytes=10 * 1024 * 1024, backupCount=7, encoding="utf-8")
+        file_handler.terminator = "" # loguru messages already end with a newline
+        self._listener = logging.handlers.QueueListener(self.queue, file_handler)
+        self._listener.start()
+
+    def write(self, message):
+        try:
+            self.queue.put_nowait(logging.makeLogRecord({"msg": str(message)}))
+        except queue.Full:
+            self.dropped += 1
+
+    def stop(self):
+        # Called by loguru when the handler is removed: writes out what is still queued and closes the file
+        self._listener.stop()
+        for handler in self._listener.handlers:
+            handler.close()
+        if self.dropped:
+            rprint(f"[orange3]{self.dropped} log lines were dropped because the log queue for '{self.log_file_path}' was full.[orange3]")
+
+def _remove_project_handlers():
+    """Remove the project file handlers added by configure_logging, leaving loguru's default console sink alone."""
+    for handler_id in LOGURU_HANDLERS.values():
         try:
             logger.remove(handler_id)
-            del LOGURU_HANDLERS[handler_id]
-        except ValueError:
+        except ValueError: # already removed elsewhere (e.g. a bare logger.remove()), keep removing the others
             pass
+    LOGURU_HANDLERS.clear()
+
+def configure_logging(project_name: str, log_level: str = "INFO"):
+    # Only one project log file is active at a time
+    _remove_project_handlers()
 
     log_dir = "logs"
-    if not os.path.exists(log_dir):
-        try:
-            os.makedirs(log_dir)
-            rprint(f"[green]Created log directory: {log_dir}[green]")
-        except OSError as e:
-            rprint(f"[red]Error creating log directory {log_dir}: {e}. Logging to console only for file logs.[red]")
+    try:
+        os.makedirs(log_dir, exist_ok=True) # one call, no exists/makedirs race
+    except OSError as e:
+        rprint(f"[red]Error creating log directory {log_dir}: {e}. Logging to console only for file logs.[red]")
 
     log_file_path = os.path.join(log_dir, f"{project_name}_ad_downloader.log")
     
     try:
+        # Rotation at 10 MB keeping 7 backups, without compression (it would block the log drain while it runs)
         handler_config = {
-            "sink": log_file_path, "level": log_level.upper(), "rotation": "10 MB",
-            "retention": "7 days", "compression": "zip", "enqueue": True,
+            "sink": _BoundedQueueSink(log_file_path), "level": log_level.upper(), "colorize": False,
+            "enqueue": False, # the sink queues by itself, with a bound
             "format": "{time:YYYY-MM-DD HH:mm:ss.SSS} | {level: <8} | {name}:{function}:{line} - {message}"
         }
         new_handler_id = logger.add(**handler_config)
         LOGURU_HANDLERS[project_name] = new_handler_id
-        rprint(f"[green]Logging configured for project '{project_name}'. Log file: {log_file_path} (Handler ID: {new_handler_id})[green]")
+        if _DEBUG:
+            rprint(f"[green]Logging configured for project '{project_name}'. Log file: {log_file_path} (Handler ID: {new_handler_id})[green]")
     except Exception as e:
         rprint(f"[red]Failed to configure file logging for project '{project_name}': {e}[red]")
         rprint("[orange3]Logging will proceed with default stderr/console loggers if any.[orange3]")
 
 def close_logger():
-    pass # Loguru usually handles cleanup
+    # Removing the file handlers stops their queue threads, so the lines still queued are written out before exit
+    _remove_project_handlers()
 
 # --- Validators ---
 class NumberValidator:
@@ -59,79 +108,149 @@ class NumberValidator:
             raise ValidationError("", reason="Invalid input. Please enter a valid number.")
         return True
 
+# The pure string checks are memoized on the input, a rejected answer retyped identically is not parsed again
+@functools.lru_cache(maxsize=64)
+def _validate_date_str(current: str) -> Tuple[bool, Optional[str]]:
+    """Check a YYYY-MM-DD date string. Returns (ok, reason)."""
+    if not current:
+        return False, "Date cannot be empty. Please use YYYY-MM-DD format."
+    try:
+        m = _DATE_RE.match(current)
+        if m: # common YYYY-MM-DD case: plain integer range checks, no datetime object needed
+            y, mo, d = int(m[1]), int(m[2]), int(m[3])
+            if not (y >= 1 and 1 <= mo <= 12):
+                raise ValueError(current)
+            leap = (y % 4 == 0 and y % 100 != 0) or y % 400 == 0
+            if not 1 <= d <= (29 if mo == 2 and leap else _MDAYS[mo]):
+                raise ValueError(current)
+        else: # strptime also accepts e.g. '2023-1-5', keep it for anything the fast path does not match
+            datetime.strptime(current, "%Y-%m-%d")
+        return True, None
+    except ValueError:
+        return False, "Invalid date format. Please use YYYY-MM-DD."
+
+@functools.lru_cache(maxsize=64)
+def _validate_country_str(current: str) -> Tuple[bool, Optional[str]]:
+    """Check a comma-separated list of 2-letter country codes, empty input is allowed. Returns (ok, bad_code)."""
+    if not current.strip():
+        return True, None
+    # Upper-case once, then plain character class checks per code (same as ^[A-Z]{2}$, without the regex)
+    for country_code in current.upper().split(','):
+        country_code = country_code.strip()
+        if len(country_code) != 2 or not country_code.isascii() or not country_code.isalpha():
+            return False, country_code
+    return True, None
+
 class DateValidator:
     @staticmethod
     def validate_date(answers, current):
-        if not current:
-            rprint("[yellow]Validator DateValidator: Date input is empty. A date is required.[yellow]")
-            raise ValidationError("", reason="Date cannot be empty. Please use YYYY-MM-DD format.")
-        try:
-            datetime.strptime(current, "%Y-%m-%d")
-            return True
-        except ValueError:
-            rprint(f"[red]Validator DateValidator: Invalid date format for '{current}'.[red]")
-            raise ValidationError("", reason="Invalid date format. Please use YYYY-MM-DD.")
+        ok, reason = _validate_date_str(current)
+        if not ok:
+            if not current:
+                rprint("[yellow]Validator DateValidator: Date input is empty. A date is required.[yellow]")
+            else:
+                rprint(f"[red]Validator DateValidator: Invalid date format for '{current}'.[red]")
+            raise ValidationError("", reason=reason)
+        return True
 
 class CountryValidator:
     @staticmethod
     def validate_country(answers, current):
-        if not current.strip():
-            return True 
-        countries = [country.strip().upper() for country in current.split(',')]
-        for country_code in countries:
-            if not re.match(r"^[A-Z]{2}$", country_code):
-                rprint(f"[red]Validator CountryValidator: Invalid country code format for '{country_code}'.[red]")
-                raise ValidationError("", reason=f"Invalid country code: '{country_code}'.")
+        ok, country_code = _validate_country_str(current)
+        if not ok:
+            rprint(f"[red]Validator CountryValidator: Invalid country code format for '{country_code}'.[red]")
+            raise ValidationError("", reason=f"Invalid country code: '{country_code}'.")
         return True
 
+# Files that passed ExcelValidator, keyed by (absolute path, mtime_ns, size) so an edited file is validated again
+_EXCEL_VALIDATION_CACHE = {}
+_EXCEL_VALIDATION_CACHE_SIZE = 64
+
+def _excel_sheet_names(file_path: str, limit: Optional[int] = None) -> list:
+    """
+    List the sheet names of an Excel file, stopping after `limit` names if given. For .xlsx only the small
+    xl/workbook.xml part of the zip is parsed (never sharedStrings.xml/styles.xml, which openpyxl loads on open).
+    Legacy .xls files (not zip based) go through pandas.
+    """
+    if file_path.lower().endswith('.xls'):
+        import pandas as pd
+        try: # on_demand: xlrd reads the sheet list without loading every sheet
+            excel_file = pd.ExcelFile(file_path, engine='xlrd', engine_kwargs={'on_demand': True})
+        except TypeError: # pandas < 2.1 has no engine_kwargs
+            excel_file = pd.ExcelFile(file_path, engine='xlrd')
+        return excel_file.sheet_names[:limit]
+    sheet_names = []
+    with zipfile.ZipFile(file_path) as z, z.open('xl/workbook.xml') as workbook_xml:
+        for _, element in ET.iterparse(workbook_xml, events=('start',)):
+            if element.tag.endswith('}sheet'):
+                sheet_names.append(element.get('name'))
+                if limit is not None and len(sheet_names) >= limit:
+                    break
+    return sheet_names
+
 class ExcelValidator:
     @staticmethod
     def validate_excel(answers, current):
         filename_to_validate = current.strip()
-        rprint(f"[cyan]Validator ExcelValidator: Validating Excel filename: '{filename_to_validate}'...[cyan]")
-        
-        # --- Added CWD and explicit path logging ---
-        current_working_directory = os.getcwd()
-        rprint(f"[magenta]Validator ExcelValidator: Current Working Directory is: {current_working_directory}[magenta]")
+        # Diagnostic lines are collected and printed with a single rprint (one render/write per validation)
+        debug_lines = []
+        if _DEBUG:
+            debug_lines.append(f"[cyan]Validator ExcelValidator: Validating Excel filename: '{filename_to_validate}'...[cyan]")
         
         if not filename_to_validate:
-            rprint(f"[red]Validator ExcelValidator: Excel filename cannot be empty.[red]")
+            rprint("\n".join(debug_lines + ["[red]Validator ExcelValidator: Excel filename cannot be empty.[red]"]))
             raise ValidationError("", reason="Excel filename cannot be empty.")
 
         # Construct path relative to CWD
         file_path_relative_to_cwd = os.path.join("data", filename_to_validate)
         # Resolve to absolute path
         abs_file_path = os.path.abspath(file_path_relative_to_cwd)
-        
-        rprint(f"[cyan]Validator ExcelValidator: Relative path constructed: '{file_path_relative_to_cwd}'[cyan]")
-        rprint(f"[cyan]Validator ExcelValidator: Absolute path resolved to: {abs_file_path}[cyan]")
 
         if not filename_to_validate.lower().endswith(('.xlsx', '.xls')):
-            rprint(f"[red]Validator ExcelValidator: Invalid file extension for '{filename_to_validate}'. Must be .xlsx or .xls.[red]")
+            rprint("\n".join(debug_lines + [f"[red]Validator ExcelValidator: Invalid file extension for '{filename_to_validate}'. Must be .xlsx or .xls.[red]"]))
             raise ValidationError("", reason=f"Invalid file extension: '{filename_to_validate}'.")
 
-        # Explicitly check existence using the absolute path
-        if not os.path.exists(abs_file_path):
-            rprint(f"[red]Validator ExcelValidator (checking absolute path '{abs_file_path}'): File does not exist.[red]")
-            # For thoroughness, also show if the relative path check would fail from the CWD
-            if not os.path.exists(file_path_relative_to_cwd):
-                 rprint(f"[red]Validator ExcelValidator (checking relative path '{file_path_relative_to_cwd}' from CWD): File also does not exist.[red]")
+        # A single stat on the absolute path; the path/CWD diagnostics are only built when the file is missing
+        try:
+            st = os.stat(abs_file_path)
+        except (FileNotFoundError, NotADirectoryError):
+            current_working_directory = os.getcwd()
+            if _DEBUG:
+                debug_lines.append(f"[magenta]Validator ExcelValidator: Current Working Directory is: {current_working_directory}[magenta]")
+            rprint("\n".join(debug_lines + [f"[red]Validator ExcelValidator (checking relative path '{file_path_relative_to_cwd}', absolute path '{abs_file_path}'): File does not exist.[red]"]))
             raise ValidationError(
                 "",
                 reason=f"File '{filename_to_validate}' (expected at '{abs_file_path}') does not exist. Ensure it's in the 'data' folder inside your project directory '{current_working_directory}'."
             )
         
-        # If we reach here, os.path.exists(abs_file_path) was true
-        rprint(f"[yellow]Validator ExcelValidator: File '{abs_file_path}' confirmed to exist. Attempting minimal read (sheet names) for validation...[yellow]")
+        # If we reach here, the file exists; an unchanged file that already passed is not probed again
+        cache_key = (abs_file_path, st.st_mtime_ns, st.st_size)
+        if _EXCEL_VALIDATION_CACHE.get(cache_key):
+            return True
+        if _DEBUG:
+            debug_lines.append(f"[yellow]Validator ExcelValidator: File '{abs_file_path}' confirmed to exist. Attempting minimal read (sheet names) for validation...[yellow]")
         try:
-            excel_file_obj = pd.ExcelFile(abs_file_path) # Use absolute path for pd.ExcelFile
-            if not excel_file_obj.sheet_names:
-                 rprint(f"[orange3]Validator ExcelValidator: Excel file '{abs_file_path}' contains no sheets.[orange3]")
+            sheet_names = _excel_sheet_names(abs_file_path, limit=None if _DEBUG else 1) # Use absolute path; one sheet is enough to be valid
+            if not sheet_names:
+                 rprint("\n".join(debug_lines + [f"[orange3]Validator ExcelValidator: Excel file '{abs_file_path}' contains no sheets.[orange3]"]))
                  raise ValidationError("", reason=f"Excel file '{filename_to_validate}' (at '{abs_file_path}') has no sheets or is empty.")
-            rprint(f"[green]Validator ExcelValidator: Excel file '{abs_file_path}' seems valid and readable (sheets: {excel_file_obj.sheet_names}).[green]")
+            if _DEBUG:
+                debug_lines.append(f"[green]Validator ExcelValidator: Excel file '{abs_file_path}' seems valid and readable (sheets: {sheet_names}).[green]")
+                rprint("\n".join(debug_lines))
+            if len(_EXCEL_VALIDATION_CACHE) >= _EXCEL_VALIDATION_CACHE_SIZE:
+                del _EXCEL_VALIDATION_CACHE[next(iter(_EXCEL_VALIDATION_CACHE))] # FIFO: dicts keep insertion order
+            _EXCEL_VALIDATION_CACHE[cache_key] = True
+        except ValidationError:
+            raise
+        except (zipfile.BadZipFile, KeyError, ET.ParseError) as e: # not a zip, no (or broken) xl/workbook.xml inside: corrupted or not an xlsx
+            rprint("\n".join(debug_lines + [f"[red]Validator ExcelValidator: '{abs_file_path}' is not a valid xlsx file: {e}[red]"]))
+            raise ValidationError(
+                "",
+                reason=f"Could not validate Excel file '{filename_to_validate}' (at '{abs_file_path}'). It might be corrupted or not a valid Excel format. Error: {type(e).__name__} - {e}"
+            )
         except Exception as e:
-            rprint(f"[red]Validator ExcelValidator: Error during minimal validation of '{abs_file_path}': {e}[red]")
             import traceback
+            rprint("\n".join(debug_lines + [f"[red]Validator ExcelValidator: Error during minimal validation of '{abs_file_path}': {e}[red]"]))
             rprint(traceback.format_exc())
             raise ValidationError(
                 "",
@@ -140,7 +259,7 @@ class ExcelValidator:
         return True
 
 # --- Other Utility Functions ---
-def update_access_token(data: pd.DataFrame, new_access_token: str) -> pd.DataFrame:
+def update_access_token(data: 'pd.DataFrame', new_access_token: str) -> 'pd.DataFrame':
     rprint(f"[cyan]Attempting to update access tokens in ad snapshot URLs...[cyan]")
     if 'ad_snapshot_url' not in data.columns:
         rprint("[orange3]Warning: 'ad_snapshot_url' column not found in data. Cannot update access tokens.[orange3]")
@@ -148,16 +267,20 @@ def update_access_token(data: pd.DataFrame, new_access_token: str) -> pd.DataFra
     if not new_access_token:
         rprint("[orange3]Warning: Provided new access token is empty. Snapshot URLs will not be updated.[orange3]")
         return data
-    updated_count = 0
-    def replace_token(url):
-        nonlocal updated_count
-        if isinstance(url, str) and 'access_token=' in url:
-            new_url = re.sub(r'access_token=([^&]+)', f'access_token={new_access_token}', url)
-            if new_url != url:
-                updated_count +=1
-            return new_url
-        return url
-    data['ad_snapshot_url'] = data['ad_snapshot_url'].apply(replace_token)
+    replacement = f'access_token={new_access_token}'
+    # Vectorized: only the URLs holding a token are rewritten, anything else (NaN, non-strings) is left untouched
+    urls = data['ad_snapshot_url'].astype('string')
+    mask = urls.str.contains('access_token=', na=False, regex=False) # plain substring scan
+    if not mask.any():
+        rprint(f"[yellow]No ad snapshot URLs required an access token update (or no URLs found with tokens).[yellow]")
+        return data
+    # The token runs from 'access_token=' up to the next '&' (or the end): two partitions instead of a regex pass
+    original_urls = urls[mask]
+    head = original_urls.str.partition('access_token=')
+    tail = head[2].str.partition('&')
+    new_urls = head[0] + replacement + tail[1] + tail[2]
+    updated_count = int((new_urls != original_urls).sum()) # counted in bulk, URLs that already had this token don't count
+    data.loc[mask, 'ad_snapshot_url'] = new_urls.astype(object)
     if updated_count > 0:
         rprint(f"[green]Access tokens updated in {updated_count} ad snapshot URLs.[green]")
     else:
@@ -165,6 +288,7 @@ def update_access_token(data: pd.DataFrame, new_access_token: str) -> pd.DataFra
     return data
 
 if __name__ == '__main__':
+    import pandas as pd
     rprint("Testing AdDownloader helper functions (run this file directly for isolated tests)")
     configure_logging("helpers_direct_test")
     logger.info("Test log message from helpers.py direct execution.")